@@ -1,9 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import csv
-import copy
 import argparse
-import itertools
 from collections import Counter
 from collections import deque
 
@@ -12,6 +10,8 @@ import numpy as np
 import mediapipe as mp
 
 from utils import CvFpsCalc
+from utils import CvVideoStream
+from utils import PointHistory
 from model import KeyPointClassifier
 from model import PointHistoryClassifier
 
@@ -22,8 +22,16 @@ def get_args():
     parser.add_argument("--device", type=int, default=0)
     parser.add_argument("--width", help='cap width', type=int, default=960)
     parser.add_argument("--height", help='cap height', type=int, default=540)
+    parser.add_argument("--max_input_size",
+                        help='longest side fed to MediaPipe (0: no resize)',
+                        type=int,
+                        default=640)
 
     parser.add_argument('--use_static_image_mode', action='store_true')
+    parser.add_argument("--max_num_hands",
+                        help='max_num_hands',
+                        type=int,
+                        default=4)
     parser.add_argument("--min_detection_confidence",
                         help='min_detection_confidence',
                         type=float,
@@ -45,8 +53,10 @@ def main():
     cap_device = args.device
     cap_width = args.width
     cap_height = args.height
+    max_input_size = args.max_input_size
 
     use_static_image_mode = args.use_static_image_mode
+    max_num_hands = args.max_num_hands
     min_detection_confidence = args.min_detection_confidence
     min_tracking_confidence = args.min_tracking_confidence
 
@@ -56,41 +66,38 @@ def main():
     cap = cv.VideoCapture(cap_device)
     cap.set(cv.CAP_PROP_FRAME_WIDTH, cap_width)
     cap.set(cv.CAP_PROP_FRAME_HEIGHT, cap_height)
+    cap = CvVideoStream(cap)
 
     # Model load #############################################################
     mp_hands = mp.solutions.hands
     hands = mp_hands.Hands(
         static_image_mode=use_static_image_mode,
-        max_num_hands=4,
+        max_num_hands=max_num_hands,
         min_detection_confidence=min_detection_confidence,
         min_tracking_confidence=min_tracking_confidence,
     )
 
-    keypoint_classifier = KeyPointClassifier()
+    # Sized so every detected hand fits in one batched invoke()
+    keypoint_classifier = KeyPointClassifier(max_batch_size=max_num_hands)
 
     point_history_classifier = PointHistoryClassifier()
 
     # Read labels ###########################################################
+    # One label per line, so no CSV parsing is needed
     with open('model/keypoint_classifier/keypoint_classifier_label.csv',
               encoding='utf-8-sig') as f:
-        keypoint_classifier_labels = csv.reader(f)
-        keypoint_classifier_labels = [
-            row[0] for row in keypoint_classifier_labels
-        ]
+        keypoint_classifier_labels = f.read().splitlines()
     with open(
             'model/point_history_classifier/point_history_classifier_label.csv',
             encoding='utf-8-sig') as f:
-        point_history_classifier_labels = csv.reader(f)
-        point_history_classifier_labels = [
-            row[0] for row in point_history_classifier_labels
-        ]
+        point_history_classifier_labels = f.read().splitlines()
 
     # FPS Measurement ########################################################
     cvFpsCalc = CvFpsCalc(buffer_len=10)
 
     # Coordinate history #################################################################
     history_length = 16
-    point_history = deque(maxlen=history_length)
+    point_history = PointHistory(maxlen=history_length)
 
     # Finger gesture history ################################################
     finger_gesture_history = deque(maxlen=history_length)
@@ -98,11 +105,16 @@ def main():
     #  ########################################################################
     mode = 0
 
+    small_image = None
+    rgb_image = None
+
     while True:
         fps = cvFpsCalc.get()
 
         # Process Key (ESC: end) #################################################
-        key = cv.waitKey(10)
+        # Frame pacing comes from CvVideoStream.read(); waitKey only has to
+        # pump window events
+        key = cv.waitKey(1)
         if key == 27:  # ESC
             break
         number, mode = select_mode(key, mode)
@@ -112,35 +124,59 @@ def main():
         if not ret:
             break
         image = cv.flip(image, 1)  # Mirror display
-        debug_image = copy.deepcopy(image)
+        # The flipped frame is a fresh BGR buffer, so draw on it directly; the
+        # RGB conversion below writes into a separate buffer for MediaPipe.
+        debug_image = image
 
         # Detection implementation #############################################################
-        image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
-
-        image.flags.writeable = False
-        results = hands.process(image)
-        image.flags.writeable = True
+        # MediaPipe returns normalized landmarks and resizes internally, so
+        # large frames can be shrunk first without rescaling the results
+        scale = max_input_size / max(image.shape[:2])
+        if 0 < scale < 1:
+            small_image = cv.resize(image, None, dst=small_image, fx=scale,
+                                    fy=scale, interpolation=cv.INTER_AREA)
+            image = small_image
+
+        # Reuse the RGB buffer across frames (OpenCV reallocates it only if
+        # the frame size changes). It must be writeable again before the next
+        # conversion writes into it.
+        rgb_image = cv.cvtColor(image, cv.COLOR_BGR2RGB, dst=rgb_image)
+
+        rgb_image.flags.writeable = False
+        results = hands.process(rgb_image)
+        rgb_image.flags.writeable = True
 
         #  ####################################################################
         if results.multi_hand_landmarks is not None:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks,
-                                                  results.multi_handedness):
-                # Bounding box calculation
-                brect = calc_bounding_rect(debug_image, hand_landmarks)
+            brects = []
+            landmark_lists = []
+            pre_processed_landmark_lists = []
+            for hand_landmarks in results.multi_hand_landmarks:
                 # Landmark calculation
-                landmark_list = calc_landmark_list(debug_image, hand_landmarks)
+                landmark_array = calc_landmark_array(debug_image,
+                                                     hand_landmarks)
+                landmark_lists.append(landmark_array.tolist())
+                # Bounding box calculation
+                brects.append(calc_bounding_rect(landmark_array))
 
                 # Conversion to relative coordinates / normalized coordinates
-                pre_processed_landmark_list = pre_process_landmark(
-                    landmark_list)
-                pre_processed_point_history_list = pre_process_point_history(
-                    debug_image, point_history)
+                pre_processed_landmark_lists.append(
+                    pre_process_landmark(landmark_array))
+
+            # Hand sign classification (all hands in one batch)
+            hand_sign_ids = keypoint_classifier.classify_batch(
+                pre_processed_landmark_lists)
+
+            for (brect, landmark_list, pre_processed_landmark_list,
+                 hand_sign_id, handedness) in zip(
+                     brects, landmark_lists, pre_processed_landmark_lists,
+                     hand_sign_ids, results.multi_handedness):
+                pre_processed_point_history_list = point_history.pre_process(
+                    debug_image.shape[1], debug_image.shape[0])
                 # Write to the dataset file
                 logging_csv(number, mode, pre_processed_landmark_list,
                             pre_processed_point_history_list)
 
-                # Hand sign classification
-                hand_sign_id = keypoint_classifier(pre_processed_landmark_list)
                 if hand_sign_id == 2:  # Point gesture
                     point_history.append(landmark_list[8])
                 else:
@@ -194,88 +230,42 @@ def select_mode(key, mode):
     return number, mode
 
 
-def calc_bounding_rect(image, landmarks):
+def calc_landmark_array(image, landmarks):
     image_width, image_height = image.shape[1], image.shape[0]
 
-    landmark_array = np.empty((0, 2), int)
-
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
+    # Keypoint
+    landmark_array = np.array([(landmark.x, landmark.y)
+                               for landmark in landmarks.landmark])
+    landmark_array = (landmark_array *
+                      (image_width, image_height)).astype(np.int32)
+    np.minimum(landmark_array, (image_width - 1, image_height - 1),
+               out=landmark_array)
 
-        landmark_point = [np.array((landmark_x, landmark_y))]
+    return landmark_array
 
-        landmark_array = np.append(landmark_array, landmark_point, axis=0)
 
+def calc_bounding_rect(landmark_array):
     x, y, w, h = cv.boundingRect(landmark_array)
 
     return [x, y, x + w, y + h]
 
 
-def calc_landmark_list(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_point = []
-
-    # Keypoint
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
-
-        landmark_point.append([landmark_x, landmark_y])
-
-    return landmark_point
-
-
 def pre_process_landmark(landmark_list):
-    temp_landmark_list = copy.deepcopy(landmark_list)
+    # float64 keeps logged training rows at the same precision as before
+    temp_landmark_array = np.array(landmark_list, dtype=np.float64)
 
     # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, landmark_point in enumerate(temp_landmark_list):
-        if index == 0:
-            base_x, base_y = landmark_point[0], landmark_point[1]
+    temp_landmark_array -= temp_landmark_array[0]
 
-        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
-        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
-
-    # Convert to a one-dimensional list
-    temp_landmark_list = list(
-        itertools.chain.from_iterable(temp_landmark_list))
+    # Convert to a one-dimensional array
+    temp_landmark_array = temp_landmark_array.ravel()
 
     # Normalization
-    max_value = max(list(map(abs, temp_landmark_list)))
-
-    def normalize_(n):
-        return n / max_value
-
-    temp_landmark_list = list(map(normalize_, temp_landmark_list))
-
-    return temp_landmark_list
-
-
-def pre_process_point_history(image, point_history):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    temp_point_history = copy.deepcopy(point_history)
-
-    # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, point in enumerate(temp_point_history):
-        if index == 0:
-            base_x, base_y = point[0], point[1]
-
-        temp_point_history[index][0] = (temp_point_history[index][0] -
-                                        base_x) / image_width
-        temp_point_history[index][1] = (temp_point_history[index][1] -
-                                        base_y) / image_height
-
-    # Convert to a one-dimensional list
-    temp_point_history = list(
-        itertools.chain.from_iterable(temp_point_history))
+    max_value = np.abs(temp_landmark_array).max()
+    if max_value != 0:
+        temp_landmark_array /= max_value
 
-    return temp_point_history
+    return temp_landmark_array
 
 
 def logging_csv(number, mode, landmark_list, point_history_list):
@@ -515,8 +505,8 @@ def draw_info_text(image, brect, handedness, hand_sign_text,
 def draw_point_history(image, point_history):
     for index, point in enumerate(point_history):
         if point[0] != 0 and point[1] != 0:
-            cv.circle(image, (point[0], point[1]), 1 + int(index / 2),
-                      (152, 251, 152), 2)
+            cv.circle(image, (int(point[0]), int(point[1])),
+                      1 + int(index / 2), (152, 251, 152), 2)
 
     return image
 
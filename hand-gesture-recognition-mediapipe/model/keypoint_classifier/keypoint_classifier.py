@@ -9,28 +9,59 @@ class KeyPointClassifier(object):
         self,
         model_path='model/keypoint_classifier/keypoint_classifier.tflite',
         num_threads=1,
+        max_batch_size=1,
     ):
         self.interpreter = tf.lite.Interpreter(model_path=model_path,
                                                num_threads=num_threads)
 
+        self.input_details = self.interpreter.get_input_details()
+        # Size the batch dimension once so every hand in a frame can be
+        # classified with a single invoke()
+        input_shape = self.input_details[0]['shape']
+        if max_batch_size != input_shape[0]:
+            self.interpreter.resize_tensor_input(
+                self.input_details[0]['index'],
+                [max_batch_size, input_shape[1]])
+
         self.interpreter.allocate_tensors()
         self.input_details = self.interpreter.get_input_details()
         self.output_details = self.interpreter.get_output_details()
 
+        # Views onto the interpreter's own buffers; calling them yields an
+        # ndarray that must be released before the next invoke()
+        self._input_tensor = self.interpreter.tensor(
+            self.input_details[0]['index'])
+        self._output_tensor = self.interpreter.tensor(
+            self.output_details[0]['index'])
+        # Full-integer models take quantized input; float models report a
+        # scale of 0
+        self._input_dtype = self.input_details[0]['dtype']
+        self._input_scale, self._input_zero_point = \
+            self.input_details[0]['quantization']
+
     def __call__(
         self,
         landmark_list,
     ):
-        input_details_tensor_index = self.input_details[0]['index']
-        self.interpreter.set_tensor(
-            input_details_tensor_index,
-            np.array([landmark_list], dtype=np.float32))
-        self.interpreter.invoke()
+        return self.classify_batch([landmark_list])[0]
 
-        output_details_tensor_index = self.output_details[0]['index']
+    def classify_batch(
+        self,
+        landmark_lists,
+    ):
+        batch_size = len(landmark_lists)
 
-        result = self.interpreter.get_tensor(output_details_tensor_index)
+        input_tensor = np.asarray(landmark_lists, dtype=np.float32)
+        if self._input_scale:
+            input_tensor = np.round(input_tensor / self._input_scale) + \
+                self._input_zero_point
+            dtype_info = np.iinfo(self._input_dtype)
+            input_tensor = np.clip(input_tensor, dtype_info.min,
+                                   dtype_info.max).astype(self._input_dtype)
+
+        self._input_tensor()[:batch_size] = input_tensor
+        self.interpreter.invoke()
 
-        result_index = np.argmax(np.squeeze(result))
+        result_indices = np.argmax(self._output_tensor()[:batch_size], axis=1)
 
-        return result_index
+        return result_indices
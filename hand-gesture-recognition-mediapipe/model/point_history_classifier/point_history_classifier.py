@@ -18,6 +18,17 @@ class PointHistoryClassifier(object):
         self.interpreter.allocate_tensors()
         self.input_details = self.interpreter.get_input_details()
         self.output_details = self.interpreter.get_output_details()
+        # Views onto the interpreter's own buffers; calling them yields an
+        # ndarray that must be released before the next invoke()
+        self._input_tensor = self.interpreter.tensor(
+            self.input_details[0]['index'])
+        self._output_tensor = self.interpreter.tensor(
+            self.output_details[0]['index'])
+        # Full-integer models take quantized input; float models report a
+        # scale of 0
+        self._input_dtype = self.input_details[0]['dtype']
+        self._input_scale, self._input_zero_point = \
+            self.input_details[0]['quantization']
 
         self.score_th = score_th
         self.invalid_value = invalid_value
@@ -26,19 +37,22 @@ class PointHistoryClassifier(object):
         self,
         point_history,
     ):
-        input_details_tensor_index = self.input_details[0]['index']
-        self.interpreter.set_tensor(
-            input_details_tensor_index,
-            np.array([point_history], dtype=np.float32))
+        input_tensor = np.asarray(point_history, dtype=np.float32)
+        if self._input_scale:
+            input_tensor = np.round(input_tensor / self._input_scale) + \
+                self._input_zero_point
+            dtype_info = np.iinfo(self._input_dtype)
+            input_tensor = np.clip(input_tensor, dtype_info.min,
+                                   dtype_info.max).astype(self._input_dtype)
+
+        self._input_tensor()[0] = input_tensor
         self.interpreter.invoke()
 
-        output_details_tensor_index = self.output_details[0]['index']
+        result = self._output_tensor()[0]
 
-        result = self.interpreter.get_tensor(output_details_tensor_index)
+        result_index = np.argmax(result)
 
-        result_index = np.argmax(np.squeeze(result))
-
-        if np.squeeze(result)[result_index] < self.score_th:
+        if result[result_index] < self.score_th:
             result_index = self.invalid_value
 
         return result_index
@@ -1 +1,3 @@
-from utils.cvfpscalc import CvFpsCalc
\ No newline at end of file
+from utils.cvfpscalc import CvFpsCalc
+from utils.cvvideostream import CvVideoStream
+from utils.pointhistory import PointHistory
\ No newline at end of file
@@ -0,0 +1,61 @@
+import threading
+
+
+class CvVideoStream(object):
+    def __init__(self, cap, release_timeout=1.0):
+        self._cap = cap
+        self._release_timeout = release_timeout
+        self._ret, self._frame = False, None
+        self._frame_count = 0
+        self._read_count = 0
+        self._stopped = False
+        self._error = None
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._update, daemon=True)
+        self._thread.start()
+
+    def _update(self):
+        # Capture on a background thread so camera I/O overlaps inference;
+        # only the most recent frame is kept
+        try:
+            while not self._stopped:
+                ret, frame = self._cap.read()
+                with self._condition:
+                    self._ret, self._frame = ret, frame
+                    self._frame_count += 1
+                    if not ret:
+                        break
+                    self._condition.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            # Always wake read(), whether the camera ran out or failed
+            with self._condition:
+                self._stopped = True
+                self._condition.notify_all()
+
+    def read(self):
+        # Wait for a frame that has not been returned yet
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._frame_count != self._read_count or
+                self._stopped)
+            if self._frame_count == self._read_count:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                return False, None
+            self._read_count = self._frame_count
+
+            return self._ret, self._frame
+
+    def release(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(self._release_timeout)
+        # A read still blocked in the driver keeps using the capture, so
+        # only release it once the thread has exited
+        if not self._thread.is_alive():
+            self._cap.release()
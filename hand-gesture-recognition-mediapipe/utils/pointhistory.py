@@ -0,0 +1,38 @@
+import numpy as np
+
+
+class PointHistory(object):
+    def __init__(self, maxlen=16):
+        self.maxlen = maxlen
+        # float64 keeps logged training rows at full precision
+        self._points = np.zeros((maxlen, 2), dtype=np.float64)
+        self._head = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return iter(self.to_array())
+
+    def append(self, point):
+        self._points[self._head] = point
+        self._head = (self._head + 1) % self.maxlen
+        self._len = min(self._len + 1, self.maxlen)
+
+    def to_array(self):
+        # Oldest point first
+        if self._len < self.maxlen:
+            return self._points[:self._len]
+        return np.roll(self._points, -self._head, axis=0)
+
+    def pre_process(self, image_width, image_height):
+        points = self.to_array()
+        if self._len == 0:
+            return points.ravel()
+
+        # Convert to relative coordinates / normalized coordinates
+        temp_point_history = points - points[0]
+        temp_point_history /= (image_width, image_height)
+
+        return temp_point_history.ravel()